@@ -1,5 +1,6 @@
+from cachetools import TTLCache
 from fastapi import FastAPI, Request
-from fastapi.responses import Response
+from fastapi.responses import ORJSONResponse, Response
 from yfinance import Ticker
 from opentelemetry import trace
 from opentelemetry import metrics
@@ -11,10 +12,12 @@ from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
 from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
 from middleware.wide_event import WideEventMiddleware
 
+import asyncio
 import logging
-import uvicorn
-import json
+import logging.handlers
+import orjson
 import os
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -24,11 +27,25 @@ load_dotenv()
 log_dir = "logs"
 os.makedirs(log_dir, exist_ok=True)
 
+# Buffer file writes so app.log gets one flush per 100 records (or on
+# ERROR) instead of a write + flush syscall per record. The formatter
+# must go on the file handler itself: basicConfig only formats the
+# handlers it is given, and the MemoryHandler never formats records.
+_file_handler = logging.FileHandler(os.path.join(log_dir, "app.log"))
+_file_handler.setFormatter(logging.Formatter(
+    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+))
+_app_log_handler = logging.handlers.MemoryHandler(
+    capacity=100,
+    flushLevel=logging.ERROR,
+    target=_file_handler,
+)
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     handlers=[
-        logging.FileHandler(os.path.join(log_dir, "app.log")),
+        _app_log_handler,
         logging.StreamHandler()  # Also log to console
     ]
 )
@@ -39,10 +56,24 @@ logger = logging.getLogger(__name__)
 # Configure OTLP exporters
 # otlp_endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "localhost:4318")
 
+# # Batch span processor tuning: a larger queue absorbs request bursts without
+# # dropping spans, while smaller batches shipped more often keep export latency
+# # low. Overridable via env so ops can retune without a redeploy.
+# bsp_max_queue_size = int(os.getenv("OTEL_BSP_MAX_QUEUE_SIZE", "4096"))
+# bsp_max_export_batch_size = int(os.getenv("OTEL_BSP_MAX_EXPORT_BATCH_SIZE", "256"))
+# bsp_schedule_delay_millis = int(os.getenv("OTEL_BSP_SCHEDULE_DELAY", "1000"))
+# bsp_export_timeout_millis = int(os.getenv("OTEL_BSP_EXPORT_TIMEOUT", "10000"))
+
 # # Set up trace exporter and provider
 # trace_exporter = OTLPSpanExporter(endpoint=otlp_endpoint)
 # trace_provider = TracerProvider()
-# trace_provider.add_span_processor(BatchSpanProcessor(trace_exporter))
+# trace_provider.add_span_processor(BatchSpanProcessor(
+#     trace_exporter,
+#     max_queue_size=bsp_max_queue_size,
+#     max_export_batch_size=bsp_max_export_batch_size,
+#     schedule_delay_millis=bsp_schedule_delay_millis,
+#     export_timeout_millis=bsp_export_timeout_millis,
+# ))
 # trace.set_tracer_provider(trace_provider)
 
 # # Set up metrics exporter and provider
@@ -62,29 +93,56 @@ health_check_counter = meter.create_counter(
     "health_check_requests",
     description="Counts the number of health check requests"
 )
+# Pre-built attribute dict: the SDK keys its aggregation buckets on the
+# attribute set, so reusing one dict avoids an allocation per poll
+_HEALTH_ATTRS = {"value": "health_check"}
 
-app = FastAPI()
+# orjson encodes responses in native code, several times faster than the
+# stdlib json path FastAPI uses by default
+app = FastAPI(default_response_class=ORJSONResponse)
 app.add_middleware(WideEventMiddleware)
 
-stocks = json.load(open("data/stocks.json"))
+# Load once at import and normalize keys upfront so lookups are a single
+# hash probe on already-uppercase tickers
+with open("data/stocks.json", "rb") as f:
+    stocks = {k.upper(): v for k, v in orjson.loads(f.read()).items()}
+
+# Ticker info served from memory for 60s so only the first request per
+# window pays the blocking Yahoo Finance network call. TTLCache is not
+# thread-safe and _fetch_info runs on worker threads, so every cache
+# access takes the lock; the network fetch itself happens outside it.
+_info_cache = TTLCache(maxsize=64, ttl=60)
+_info_cache_lock = threading.Lock()
+
+def _fetch_info(sym: str) -> dict:
+    """Fetch ticker info from Yahoo Finance, served from a TTL cache."""
+    with _info_cache_lock:
+        info = _info_cache.get(sym)
+    if info is None:
+        info = Ticker(sym).info
+        with _info_cache_lock:
+            _info_cache[sym] = info
+    return info
+
+# /health returns the same payload every time: serialize it once and
+# hand the bytes straight to a Response, skipping per-poll encoding
+_HEALTH_BYTES = orjson.dumps({"status": "Service is healthy"})
+_HEALTH_EVENT_CTX = {
+    "endpoint": "health",
+    "result": "Service is healthy",
+    "user_id": "123",
+    "user_name": "phil"
+}
 
 @app.get("/health")
 def read_root(request: Request):
     # Wide Event Approach
-    result = "Service is healthy"
-    user_id = '123'
-    
-    health_check_counter.add(1, {"value": "health_check"})
-    
+    health_check_counter.add(1, _HEALTH_ATTRS)
+
     # Add business context to wide_event using batch helper
-    request.state.add_event_data_batch({
-        "endpoint": "health",
-        "result": result,
-        "user_id": user_id,
-        "user_name": "phil"
-    })
-    
-    return {"status": result}
+    request.state.add_event_data_batch(_HEALTH_EVENT_CTX)
+
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 @app.get("/user/{user_id}")
 def get_user(user_id: int, request: Request):
@@ -94,7 +152,7 @@ def get_user(user_id: int, request: Request):
         span.set_attribute("user.id", user_id)
         span.set_attribute("user.role", "standard")
         span.set_attribute("user.name", "phil")
-        logger.info(f"Fetching user with ID: {user_id}")
+        logger.info("Fetching user with ID: %s", user_id)
 
         # # Approach 2 Add user context to wide event middleware
         # request.state.wide_event["endpoint"] = "get_user"
@@ -107,7 +165,7 @@ def get_user(user_id: int, request: Request):
 def calculate_sum(request: Request):
     # WIDE EVENT APPROACH
     result = 1 + 1
-    logger.info(f"Calculating sum of {1} and {1}")
+    logger.info("Calculating sum of %s and %s", 1, 1)
     request.state.add_event_data_batch({
         "endpoint": "calculate_sum",
         "operands": {"a": 1, "b": 1},
@@ -116,11 +174,12 @@ def calculate_sum(request: Request):
     return {"sum": result}
 
 @app.get("/stock/NVDA")
-def get_stock_info(request: Request):
+async def get_stock_info(request: Request):
     # OTEL Approach
     with tracer.start_as_current_span("fetch-nvda-stock-info") as span:
-        ticker = Ticker("NVDA")
-        info = ticker.info
+        # Run the blocking yfinance call on a worker thread so the event
+        # loop keeps serving other requests
+        info = await asyncio.to_thread(_fetch_info, "NVDA")
         span.set_attribute("stock.symbol", "NVDA")
         span.set_attribute("stock.currentPrice", info.get("currentPrice"))
         span.set_attribute("stock.marketCap", info.get("marketCap"))
@@ -130,7 +189,14 @@ def get_stock_info(request: Request):
         # request.state.wide_event["stock_symbol"] = info.get("symbol")
         # request.state.wide_event["stock_price"] = info.get("currentPrice")
         # request.state.wide_event["market_cap"] = info.get("marketCap")
-    logger.info(f"Fetched stock info for NVDA: {info}")
+    # Log only the key fields lazily; repr-ing the full info dict per
+    # request is expensive even when INFO is disabled
+    logger.info(
+        "Fetched stock info for NVDA: symbol=%s currentPrice=%s marketCap=%s",
+        info.get("symbol"),
+        info.get("currentPrice"),
+        info.get("marketCap"),
+    )
     return {
         "symbol": info.get("symbol"),
         "shortName": info.get("shortName"),
@@ -141,37 +207,50 @@ def get_stock_info(request: Request):
 def get_stock_by_ticker(ticker: str, request: Request):
     # WIDE EVENT APPROACH
     with tracer.start_as_current_span("fetch-stock-info") as span:
-        stock_data = stocks.get(ticker.upper())
+        # Uppercase the untrusted user input once and reuse it
+        sym = ticker.upper()
+        stock_data = stocks.get(sym)
         if not stock_data:
-            logger.error(f"Stock data for ticker {ticker} not found")
+            logger.error("Stock data for ticker %s not found", ticker)
             request.state.wide_event["endpoint"] = "get_stock_by_ticker"
             request.state.wide_event["stock_ticker"] = ticker
             request.state.wide_event["error"] = "Ticker not found"
             return {"error": "Ticker not found"}, 404
-        span.set_attribute("stock.symbol", ticker.upper())
+        span.set_attribute("stock.symbol", sym)
         request.state.wide_event["endpoint"] = "get_stock_by_ticker"
-        request.state.wide_event["stock_ticker"] = ticker.upper()
+        request.state.wide_event["stock_ticker"] = sym
         request.state.wide_event["stock_data"] = stock_data
-    logger.info(f"Fetched stock data for {ticker}: {stock_data}")
+    logger.info("Fetched stock data for %s: %s", ticker, stock_data)
     return stock_data
 
 # OTLP endpoints (REQUIRED)
-@app.post("/v1/traces")
-async def traces(request: Request):
-    body = await request.body()
-    print(f"Traces: {len(body)} bytes")
-    return Response(status_code=200)
-
-@app.post("/v1/metrics")
-async def metrics(request: Request):
-    body = await request.body()
-    print(f"Metrics: {len(body)} bytes")
-    return Response(status_code=200)
-
-@app.post("/v1/logs")
-async def logs(request: Request):
-    body = await request.body()
-    print(f"Logs: {len(body)} bytes")
-    return Response(status_code=200)
-
-uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+# Batched exports can be MB-sized, so drain the body chunk by chunk
+# instead of buffering it all with request.body(), and count the bytes
+# with a metric instead of printing per request
+otlp_bytes_counter = meter.create_counter(
+    "otlp_ingress_bytes",
+    description="Counts bytes received on the OTLP ingress endpoints"
+)
+
+def _make_otlp_handler(path: str):
+    attrs = {"signal": path.rsplit("/", 1)[-1]}
+
+    async def otlp_ingress(request: Request):
+        n = 0
+        async for chunk in request.stream():
+            n += len(chunk)
+        otlp_bytes_counter.add(n, attrs)
+        return Response(status_code=200)
+
+    return otlp_ingress
+
+for _path in ("/v1/traces", "/v1/metrics", "/v1/logs"):
+    app.add_api_route(_path, _make_otlp_handler(_path), methods=["POST"])
+
+def create_app() -> FastAPI:
+    """App factory for the uvicorn CLI.
+
+    Run with:
+        uvicorn api:create_app --factory --loop uvloop --http httptools --workers 4
+    """
+    return app
\ No newline at end of file
@@ -4,7 +4,9 @@ Converts the TypeScript test.ts example to Python/FastAPI.
 """
 
 from fastapi import FastAPI, Request
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+import asyncio
 import time
 import logging
 
@@ -13,37 +15,50 @@ logger = logging.getLogger(__name__)
 app = FastAPI()
 
 # Mock data structures
+# slots=True packs fields into __slots__: no per-instance __dict__, so
+# the hot /checkout path allocates less per User/Cart/CartItem/PaymentResult
+@dataclass(slots=True)
 class User:
-    def __init__(self, id: str, subscription: str, created_at: datetime, ltv: int):
-        self.id = id
-        self.subscription = subscription
-        self.created_at = created_at
-        self.ltv = ltv
+    id: str
+    subscription: str
+    created_at: datetime
+    ltv: int
 
+@dataclass(slots=True)
 class CartItem:
-    def __init__(self, name: str, price: int):
-        self.name = name
-        self.price = price
+    name: str
+    price: int
 
+@dataclass(slots=True)
 class Cart:
-    def __init__(self, id: str, items: list[CartItem], coupon: dict = None):
-        self.id = id
-        self.items = items
-        self.coupon = coupon
-        self.total = sum(item.price for item in items)
-
+    id: str
+    items: list[CartItem]
+    coupon: dict = None
+    total: int = field(init=False)
+    _prices: tuple[int, ...] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # Pull prices into a tuple once; summing it skips the per-item
+        # attribute lookup and the tuple is reusable for later pricing math
+        self._prices = tuple(item.price for item in self.items)
+        self.total = sum(self._prices)
+
+@dataclass(slots=True)
 class PaymentResult:
-    def __init__(self, method: str, provider: str, attempt: int, order_id: str = None, error: dict = None):
-        self.method = method
-        self.provider = provider
-        self.attempt = attempt
-        self.order_id = order_id
-        self.error = error
+    method: str
+    provider: str
+    attempt: int
+    order_id: str = None
+    error: dict = None
 
 # Helper functions
-def days_since(date: datetime) -> int:
-    """Calculate days since a given date."""
-    return (datetime.now() - date).days
+def days_since(date: datetime, now: datetime = None) -> int:
+    """Calculate days since a given date.
+
+    Pass a precomputed `now` when several fields need the same clock
+    reading, so the clock is only read once per request.
+    """
+    return ((now or datetime.now()) - date).days
 
 async def get_user(user_id: str) -> User:
     """Mock: Fetch user from database."""
@@ -91,12 +106,15 @@ async def checkout(request: Request):
     # Mock user (in real app, extract from auth token)
     user_id = request.headers.get('user-id', 'user-123')
     user = await get_user(user_id)
-    
+
+    # Read the clock once per request and reuse it
+    _now = datetime.now()
+
     # Add user context to event
     event['user'] = {
         'id': user.id,
         'subscription': user.subscription,
-        'account_age_days': days_since(user.created_at),
+        'account_age_days': days_since(user.created_at, _now),
         'lifetime_value_cents': user.ltv,
     }
     
@@ -140,16 +158,17 @@ async def checkout_v2(request: Request):
     """
     Checkout endpoint using add_event_data_batch helper for more concise code.
     """
-    import asyncio
-    
     user_id = request.headers.get('user-id', 'user-123')
     user = await get_user(user_id)
-    
+
+    # Read the clock once per request and reuse it
+    _now = datetime.now()
+
     # Add user context
     request.state.add_event_data('user', {
         'id': user.id,
         'subscription': user.subscription,
-        'account_age_days': days_since(user.created_at),
+        'account_age_days': days_since(user.created_at, _now),
         'lifetime_value_cents': user.ltv,
     })
     
@@ -188,6 +207,5 @@ async def checkout_v2(request: Request):
 
 if __name__ == '__main__':
     import uvicorn
-    import asyncio
-    
+
     uvicorn.run(app, host='0.0.0.0', port=8001)
@@ -1,116 +1,213 @@
- import argparse
- from pathlib import Path
- from typing import Optional
- import sys
-
- import pandas as pd
- import yfinance as yf
-
-
- def fetch_history(
-     ticker: str,
-     period: str = "1y",
-     interval: str = "1d",
-     auto_adjust: bool = False,
- ) -> pd.DataFrame:
-     """Fetch historical price data for a ticker using yfinance.
-
-     Returns a DataFrame with a DatetimeIndex and adds convenience columns.
-     """
-     if not ticker:
-         raise ValueError("ticker must be provided")
-
-     history = yf.Ticker(ticker).history(
-         period=period,
-         interval=interval,
-         auto_adjust=auto_adjust,
-     )
-
-     if history.empty:
-         raise RuntimeError(
-             f"No data returned for {ticker} (period={period}, interval={interval})."
-         )
-
-     # Ensure index is named and accessible when saving
-     history.index.name = "Date"
-     history["Ticker"] = ticker
-     # Simple daily return percentage based on Close price
-     if "Close" in history.columns:
-         history["ReturnPct"] = history["Close"].pct_change() * 100.0
-
-     return history
-
-
- def save_dataframe_to_csv(df: pd.DataFrame, output_path: Path) -> None:
-     """Save DataFrame to CSV, creating parent directories as needed."""
-     output_path.parent.mkdir(parents=True, exist_ok=True)
-     df.to_csv(output_path)
-
-
- def build_default_output_path(
-     ticker: str, period: str, interval: str, directory: Optional[Path] = None
- ) -> Path:
-     directory = directory or Path("data")
-     filename = f"{ticker.upper()}_{period}_{interval}.csv"
-     return directory / filename
-
-
- def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
-     parser = argparse.ArgumentParser(
-         description="Fetch historical market data with yfinance and save as CSV",
-     )
-     parser.add_argument("--ticker", required=True, help="Ticker symbol, e.g. AAPL")
-     parser.add_argument(
-         "--period",
-         default="1y",
-         help="Data period (e.g. 1mo, 3mo, 6mo, 1y, 5y, max)",
-     )
-     parser.add_argument(
-         "--interval",
-         default="1d",
-         help="Sampling interval (e.g. 1d, 1h, 5m). Depends on period.",
-     )
-     parser.add_argument(
-         "--adjusted",
-         action="store_true",
-         help="Use adjusted prices (yfinance auto_adjust).",
-     )
-     parser.add_argument(
-         "--out",
-         default=None,
-         help="Output CSV path. Defaults to data/{TICKER}_{period}_{interval}.csv",
-     )
-     return parser.parse_args(argv)
-
-
- def main(argv: Optional[list[str]] = None) -> int:
-     args = parse_args(argv)
-
-     output_path = (
-         Path(args.out)
-         if args.out
-         else build_default_output_path(args.ticker, args.period, args.interval)
-     )
-
-     try:
-         df = fetch_history(
-             ticker=args.ticker,
-             period=args.period,
-             interval=args.interval,
-             auto_adjust=args.adjusted,
-         )
-         save_dataframe_to_csv(df, output_path)
-     except Exception as exc:
-         print(f"Error: {exc}", file=sys.stderr)
-         return 1
-
-     print(
-         f"Saved {len(df):,} rows for {args.ticker.upper()} to {output_path.as_posix()}"
-     )
-     return 0
-
-
- if __name__ == "__main__":
-     raise SystemExit(main())
+import argparse
+from pathlib import Path
+from typing import Optional
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import yfinance as yf
+
+
+def _return_pct(close: np.ndarray) -> np.ndarray:
+    """Daily return percentage of a Close array.
+
+    Computed with NumPy ufuncs writing into one preallocated array
+    rather than pandas' pct_change, which allocates a shifted Series
+    plus several temporaries per call.
+    """
+    ret = np.empty_like(close, dtype=np.float64)
+    ret[0] = np.nan
+    np.subtract(close[1:], close[:-1], out=ret[1:])
+    ret[1:] /= close[:-1]
+    ret[1:] *= 100.0
+    return ret
+
+
+def fetch_history(
+    tickers: str | list[str],
+    period: str = "1y",
+    interval: str = "1d",
+    auto_adjust: bool = False,
+) -> pd.DataFrame:
+    """Fetch historical price data for one or more tickers using yfinance.
+
+    A single ticker goes through Ticker().history(); a list goes through
+    yf.download(), whose threaded downloader reuses connections and
+    amortizes the TLS handshake across tickers. Returns a DataFrame with
+    a DatetimeIndex and adds convenience columns; multi-ticker results
+    are stacked long-form with a Ticker column.
+    """
+    if not tickers:
+        raise ValueError("ticker must be provided")
+
+    if isinstance(tickers, str):
+        tickers = [tickers]
+
+    if len(tickers) == 1:
+        ticker = tickers[0]
+        history = yf.Ticker(ticker).history(
+            period=period,
+            interval=interval,
+            auto_adjust=auto_adjust,
+        )
+
+        if history.empty:
+            raise RuntimeError(
+                f"No data returned for {ticker} (period={period}, interval={interval})."
+            )
+
+        # Ensure index is named and accessible when saving
+        history.index.name = "Date"
+        history["Ticker"] = ticker
+        # Simple daily return percentage based on Close price
+        if "Close" in history.columns:
+            history["ReturnPct"] = _return_pct(history["Close"].to_numpy())
+
+        return history
+
+    raw = yf.download(
+        tickers,
+        period=period,
+        interval=interval,
+        auto_adjust=auto_adjust,
+        group_by="ticker",
+        threads=True,
+        progress=False,
+    )
+
+    if raw.empty:
+        raise RuntimeError(
+            f"No data returned for {', '.join(tickers)} "
+            f"(period={period}, interval={interval})."
+        )
+
+    # Reshape the MultiIndex columns into long form, one block per ticker
+    frames = []
+    for ticker in tickers:
+        if ticker not in raw.columns.get_level_values(0):
+            continue
+        part = raw[ticker].dropna(how="all")
+        if part.empty:
+            continue
+        part = part.copy()
+        part.index.name = "Date"
+        part["Ticker"] = ticker
+        if "Close" in part.columns:
+            part["ReturnPct"] = _return_pct(part["Close"].to_numpy())
+        frames.append(part)
+
+    if not frames:
+        raise RuntimeError(
+            f"No data returned for {', '.join(tickers)} "
+            f"(period={period}, interval={interval})."
+        )
+
+    return pd.concat(frames)
+
+
+def save_dataframe(df: pd.DataFrame, output_path: Path) -> None:
+    """Save DataFrame to Parquet or CSV based on the path suffix,
+    creating parent directories as needed.
+
+    Parquet (the default format) is columnar, dictionary-encoded and
+    zstd-compressed: 3-10x smaller on disk than CSV and much faster to
+    re-read. CSV goes through pyarrow's writer, which formats in
+    vectorized C++ and streams to disk in chunks, instead of pandas'
+    row-by-row to_csv.
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if output_path.suffix == ".parquet":
+        df.to_parquet(output_path, engine="pyarrow", compression="zstd", index=True)
+    else:
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        pacsv.write_csv(table, output_path)
+
+
+def build_default_output_path(
+    ticker: str,
+    period: str,
+    interval: str,
+    directory: Optional[Path] = None,
+    fmt: str = "parquet",
+) -> Path:
+    directory = directory or Path("data")
+    filename = f"{ticker.upper()}_{period}_{interval}.{fmt}"
+    return directory / filename
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Fetch historical market data with yfinance and save as Parquet or CSV",
+    )
+    parser.add_argument(
+        "--ticker",
+        required=True,
+        help="Ticker symbol(s), comma-separated, e.g. AAPL or AAPL,MSFT,NVDA",
+    )
+    parser.add_argument(
+        "--period",
+        default="1y",
+        help="Data period (e.g. 1mo, 3mo, 6mo, 1y, 5y, max)",
+    )
+    parser.add_argument(
+        "--interval",
+        default="1d",
+        help="Sampling interval (e.g. 1d, 1h, 5m). Depends on period.",
+    )
+    parser.add_argument(
+        "--adjusted",
+        action="store_true",
+        help="Use adjusted prices (yfinance auto_adjust).",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("csv", "parquet"),
+        default="parquet",
+        help="Output file format (default: parquet).",
+    )
+    parser.add_argument(
+        "--out",
+        default=None,
+        help="Output path. Defaults to data/{TICKER}_{period}_{interval}.{format}",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+
+    tickers = [t.strip().upper() for t in args.ticker.split(",") if t.strip()]
+    ticker_label = "-".join(tickers)
+
+    output_path = (
+        Path(args.out)
+        if args.out
+        else build_default_output_path(
+            ticker_label, args.period, args.interval, fmt=args.format
+        )
+    )
+
+    try:
+        df = fetch_history(
+            tickers=tickers,
+            period=args.period,
+            interval=args.interval,
+            auto_adjust=args.adjusted,
+        )
+        save_dataframe(df, output_path)
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    print(
+        f"Saved {len(df):,} rows for {ticker_label} to {output_path.as_posix()}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
 
 
@@ -1,69 +1,128 @@
+import atexit
+import queue
+import random
 import time
 import logging
+import orjson
 import os
-from datetime import datetime
-from typing import Callable, Any
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener
+from typing import Any
 
 # Configure file logging for wide events
 def setup_file_logging():
-    """Set up file logging for wide events."""
+    """Set up file logging for wide events behind a background queue.
+
+    The request thread only enqueues the record; a QueueListener thread
+    does the blocking file write so dispatch never waits on disk I/O.
+    """
     logs_dir = "logs"
     if not os.path.exists(logs_dir):
         os.makedirs(logs_dir)
-    
+
     log_file = os.path.join(logs_dir, "wide_events.log")
-    
+
     # Create a file handler
     file_handler = logging.FileHandler(log_file)
     file_handler.setLevel(logging.INFO)
-    
+
     # Create a formatter
     formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     file_handler.setFormatter(formatter)
-    
-    return file_handler
+
+    # Buffer records in memory so many small writes coalesce into one
+    # flush; errors flush immediately, and close() flushes the rest
+    buffered_handler = MemoryHandler(
+        capacity=100, flushLevel=logging.ERROR, target=file_handler
+    )
+
+    # Hand the buffered handler to a background listener thread and give
+    # the logger a queue handler so emitting is just a queue put
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, buffered_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    return QueueHandler(log_queue)
 
 logger = logging.getLogger(__name__)
 logger.addHandler(setup_file_logging())
 
+# Head-based sampling per path: load-balancer health polls and OTLP
+# ingress traffic would otherwise drown the wide-event log in noise.
+# Paths not listed are always sampled.
+_SAMPLE_RATES = {
+    "/health": 0.01,
+    "/v1/traces": 0.0,
+    "/v1/metrics": 0.0,
+    "/v1/logs": 0.0,
+}
+
+def _discard_event_data(data: dict[str, Any]) -> None:
+    """Batch helper stand-in for unsampled requests."""
+
 
-class WideEventMiddleware(BaseHTTPMiddleware):
+class WideEventMiddleware:
     """
     Middleware for tracking and logging wide events with request context.
     Records request/response metadata, timing, and error information.
+
+    Implemented as pure ASGI rather than BaseHTTPMiddleware, whose
+    dispatch model spawns a Task plus an anyio stream pair per request.
     """
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
+    def __init__(self, app):
+        self.app = app
+        # Deployment metadata never changes during the process lifetime;
+        # read it once here rather than at module import, which would run
+        # before the application has called load_dotenv()
+        self._static_tags = {
+            "service": os.getenv("SERVICE_NAME"),
+            "version": os.getenv("SERVICE_VERSION"),
+            "deployment_id": os.getenv("DEPLOYMENT_ID"),
+            "region": os.getenv("REGION"),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        # scope["state"] backs request.state, so handlers keep using the
+        # request.state.wide_event / add_event_data_batch helpers
+        state = scope.setdefault("state", {})
+
+        # Skip event construction entirely for unsampled requests; handlers
+        # still get a batch helper, it just discards the data
+        rate = _SAMPLE_RATES.get(scope["path"], 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            state["add_event_data_batch"] = _discard_event_data
+            return await self.app(scope, receive, send)
+
+        start_ns = time.time_ns()
 
         # Initialize the wide event with request context
         event: dict[str, Any] = {
-            "request_id": request.headers.get("x-request-id"),
-            "timestamp": datetime.now().isoformat() + "Z",
-            "method": request.method,
-            "path": request.url.path,
-            "service": self._get_env("SERVICE_NAME"),
-            "version": self._get_env("SERVICE_VERSION"),
-            "deployment_id": self._get_env("DEPLOYMENT_ID"),
-            "region": self._get_env("REGION"),
+            **self._static_tags,
+            "request_id": _header(scope, b"x-request-id"),
+            "timestamp_ns": start_ns,
+            "method": scope["method"],
+            "path": scope["path"],
         }
 
         # Make the event accessible to handlers
-        # request.state.wide_event = event
-        # request.state.add_event_data = lambda key, value: self._add_event_data(event, key, value)
-        request.state.add_event_data_batch = lambda data: self._add_event_data_batch(event, data)
+        state["wide_event"] = event
+        state["add_event_data_batch"] = event.update
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                event["status_code"] = message["status"]
+            await send(message)
 
         try:
-            response = await call_next(request)
-            event["status_code"] = response.status_code
+            await self.app(scope, receive, send_wrapper)
             event["outcome"] = "success"
-            return response
 
         except Exception as error:
             event["status_code"] = 500
@@ -77,23 +136,16 @@ class WideEventMiddleware(BaseHTTPMiddleware):
             raise
 
         finally:
-            event["duration_ms"] = (time.time() - start_time) * 1000
-
-            # Emit the wide event
-            logger.info(event)
-
-    @staticmethod
-    def _add_event_data(event: dict[str, Any], key: str, value: Any) -> None:
-        """Dynamically add a single key-value pair to the event."""
-        event[key] = value
-
-    @staticmethod
-    def _add_event_data_batch(event: dict[str, Any], data: dict[str, Any]) -> None:
-        """Dynamically add multiple key-value pairs to the event at once."""
-        event.update(data)
-
-    @staticmethod
-    def _get_env(key: str) -> str | None:
-        """Helper to safely get environment variables."""
-        import os
-        return os.getenv(key)
+            event["duration_ms"] = (time.time_ns() - start_ns) / 1e6
+
+            # Emit the wide event, pre-serialized with orjson so the
+            # LogRecord carries a ready-made string
+            logger.info(orjson.dumps(event).decode())
+
+
+def _header(scope, name: bytes) -> str | None:
+    """Pull a single header value out of the raw ASGI header list."""
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None